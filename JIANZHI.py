@@ -1,10 +1,34 @@
+import os
+import logging
+import threading
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
+import numpy as np
 from PIL import Image
-from transformers import pipeline
+import torch
+from transformers import AutoImageProcessor, pipeline
 from deep_translator import GoogleTranslator
 
+try:
+    import orjson as fast_json  # 比标准库 json 解析快 2~3 倍
+except ImportError:
+    import json as fast_json
+
+# numba 是可选依赖，没写进 requirements.txt：装了就用编译好的内核算目标，
+# 没装就按普通 Python 跑，结果完全一样
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        """没装 numba 时原样返回函数，按普通 Python 跑"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 # ==========================================
 # 0. 全局配置 (已修复 layout 错误)
 # ==========================================
@@ -18,53 +42,202 @@ st.set_page_config(
 # ==========================================
 # 1. 工具函数
 # ==========================================
+# Food-101 的 101 个类别提前翻译好，AI 识别结果绝大多数情况不用联网翻译
+FOOD101_ZH = {
+    "apple pie": "苹果派",
+    "baby back ribs": "烤猪肋排",
+    "baklava": "果仁蜜饼",
+    "beef carpaccio": "生牛肉片",
+    "beef tartare": "鞑靼牛肉",
+    "beet salad": "甜菜沙拉",
+    "beignets": "法式甜甜圈",
+    "bibimbap": "石锅拌饭",
+    "bread pudding": "面包布丁",
+    "breakfast burrito": "早餐卷饼",
+    "bruschetta": "意式烤面包",
+    "caesar salad": "凯撒沙拉",
+    "cannoli": "奶油甜馅煎饼卷",
+    "caprese salad": "卡普雷塞沙拉",
+    "carrot cake": "胡萝卜蛋糕",
+    "ceviche": "酸橘汁腌鱼",
+    "cheese plate": "奶酪拼盘",
+    "cheesecake": "芝士蛋糕",
+    "chicken curry": "咖喱鸡",
+    "chicken quesadilla": "鸡肉奶酪薄饼",
+    "chicken wings": "鸡翅",
+    "chocolate cake": "巧克力蛋糕",
+    "chocolate mousse": "巧克力慕斯",
+    "churros": "西班牙油条",
+    "clam chowder": "蛤蜊浓汤",
+    "club sandwich": "总汇三明治",
+    "crab cakes": "蟹肉饼",
+    "creme brulee": "焦糖布丁",
+    "croque madame": "法式火腿蛋三明治",
+    "cup cakes": "纸杯蛋糕",
+    "deviled eggs": "魔鬼蛋",
+    "donuts": "甜甜圈",
+    "dumplings": "饺子",
+    "edamame": "毛豆",
+    "eggs benedict": "班尼迪克蛋",
+    "escargots": "法式焗蜗牛",
+    "falafel": "炸鹰嘴豆丸子",
+    "filet mignon": "菲力牛排",
+    "fish and chips": "炸鱼薯条",
+    "foie gras": "鹅肝",
+    "french fries": "薯条",
+    "french onion soup": "法式洋葱汤",
+    "french toast": "法式吐司",
+    "fried calamari": "炸鱿鱼圈",
+    "fried rice": "炒饭",
+    "frozen yogurt": "冻酸奶",
+    "garlic bread": "蒜蓉面包",
+    "gnocchi": "意式土豆团子",
+    "greek salad": "希腊沙拉",
+    "grilled cheese sandwich": "烤奶酪三明治",
+    "grilled salmon": "烤三文鱼",
+    "guacamole": "牛油果酱",
+    "gyoza": "日式煎饺",
+    "hamburger": "汉堡包",
+    "hot and sour soup": "酸辣汤",
+    "hot dog": "热狗",
+    "huevos rancheros": "墨西哥煎蛋饼",
+    "hummus": "鹰嘴豆泥",
+    "ice cream": "冰淇淋",
+    "lasagna": "千层面",
+    "lobster bisque": "龙虾浓汤",
+    "lobster roll sandwich": "龙虾卷",
+    "macaroni and cheese": "芝士通心粉",
+    "macarons": "马卡龙",
+    "miso soup": "味噌汤",
+    "mussels": "青口贝",
+    "nachos": "玉米片",
+    "omelette": "煎蛋卷",
+    "onion rings": "洋葱圈",
+    "oysters": "生蚝",
+    "pad thai": "泰式炒河粉",
+    "paella": "西班牙海鲜饭",
+    "pancakes": "松饼",
+    "panna cotta": "意式奶冻",
+    "peking duck": "北京烤鸭",
+    "pho": "越南河粉",
+    "pizza": "披萨",
+    "pork chop": "猪排",
+    "poutine": "肉汁奶酪薯条",
+    "prime rib": "肋眼牛排",
+    "pulled pork sandwich": "手撕猪肉三明治",
+    "ramen": "拉面",
+    "ravioli": "意式饺子",
+    "red velvet cake": "红丝绒蛋糕",
+    "risotto": "意式烩饭",
+    "samosa": "萨莫萨三角饺",
+    "sashimi": "刺身",
+    "scallops": "扇贝",
+    "seaweed salad": "海藻沙拉",
+    "shrimp and grits": "虾仁玉米粥",
+    "spaghetti bolognese": "肉酱意面",
+    "spaghetti carbonara": "培根蛋酱意面",
+    "spring rolls": "春卷",
+    "steak": "牛排",
+    "strawberry shortcake": "草莓奶油蛋糕",
+    "sushi": "寿司",
+    "tacos": "墨西哥卷饼",
+    "takoyaki": "章鱼小丸子",
+    "tiramisu": "提拉米苏",
+    "tuna tartare": "鞑靼金枪鱼",
+    "waffles": "华夫饼"
+}
+
+@st.cache_data(ttl=86400, max_entries=2048, show_spinner=False)
+def _translate_cached(text):
+    """联网翻译，同一个词一天内只翻一次"""
+    return GoogleTranslator(source='auto', target='zh-CN').translate(text)
+
 def translate_to_chinese(text):
     """把AI识别的英文单词翻译成中文"""
+    if text in FOOD101_ZH:
+        return FOOD101_ZH[text]
     try:
-        translated = GoogleTranslator(source='auto', target='zh-CN').translate(text)
-        return translated
+        return _translate_cached(text)
     except:
         return text
 
 def safe_float(val):
     """防弹衣：把任何垃圾数据强行转为数字"""
+    # 常见类型直接返回，不走 try/except
+    t = type(val)
+    if t is float: return val
+    if t is int: return float(val)
+    if val is None: return 0.0
     try:
-        if val is None: return 0.0
         return float(val)
     except:
         return 0.0
 
+def load_upload_image(file, size=(256, 256)):
+    """读取上传的照片并先缩成小图，手机原图几千像素，模型只要 224x224"""
+    image = Image.open(file)
+    image.draft("RGB", size)  # JPEG 解码时直接按比例缩小，省掉大半解码量
+    image = image.convert("RGB")
+    image.thumbnail(size, Image.BILINEAR)
+    return image
+
 # ==========================================
 # 2. 核心引擎
 # ==========================================
+def _targets_py(weight, height, age, is_male, af, gm):
+    """BMR -> TDEE -> 目标热量 -> 三大营养素，一次算完"""
+    base = 10.0 * weight + 6.25 * height - 5.0 * age
+    bmr = base + 5.0 if is_male else base - 161.0
+    target_kcal = bmr * af * gm
+    p_g = weight * 2.0
+    f_kcal = target_kcal * 0.25
+    c_g = max(0.0, target_kcal - p_g * 4.0 - f_kcal) / 4.0
+    return target_kcal, p_g, f_kcal / 9.0, c_g
+
+@st.cache_resource(show_spinner=False)
+def _get_targets_kernel():
+    """按固定签名编译一次，整个进程共用"""
+    # 脚本每次 rerun 都会重新执行，放在模块顶层会每次都重编译；
+    # 首次编译约 0.2 秒 (加上 import numba 约 0.3 秒)，之后不再有这笔开销。
+    # 不开磁盘缓存 (cache=True)：索引文件可能记错模块名，之后每次加载都报错；
+    # 也不开 fastmath：浮点运算顺序不能变，否则显示的整数会和原来不一样
+    try:
+        return njit("UniTuple(float64, 4)(float64, float64, float64, boolean, float64, float64)")(_targets_py)
+    except Exception:
+        logging.getLogger(__name__).warning("Numba 内核编译失败，改用纯 Python 计算", exc_info=True)
+        return _targets_py
+
 class MetabolicEngine:
-    ACTIVITY_LEVELS = {
-        "久坐 (办公室工作)": 1.2,
-        "轻度 (每周运动1-3次)": 1.375,
-        "中度 (每周运动3-5次)": 1.55,
-        "高度 (每周运动6-7次)": 1.725,
-        "极度 (体力劳动/双练)": 1.9
-    }
+    # 下拉框只传下标，按下标直接查数组，不用拿中文字符串做字典键
+    ACTIVITY_LABELS = (
+        "久坐 (办公室工作)",
+        "轻度 (每周运动1-3次)",
+        "中度 (每周运动3-5次)",
+        "高度 (每周运动6-7次)",
+        "极度 (体力劳动/双练)"
+    )
+    ACTIVITY_VALUES = np.array([1.2, 1.375, 1.55, 1.725, 1.9], dtype=np.float64)
 
-    GOAL_MODIFIERS = {
-        "精瘦增肌 (+10% 热量)": 1.10,
-        "保持当前状态": 1.0,
-        "强力减脂 (-15% 热量)": 0.85
-    }
+    GOAL_LABELS = (
+        "精瘦增肌 (+10% 热量)",
+        "保持当前状态",
+        "强力减脂 (-15% 热量)"
+    )
+    GOAL_VALUES = np.array([1.10, 1.0, 0.85], dtype=np.float64)
 
     @staticmethod
     def calculate_targets(weight, height, age, gender, activity, goal):
-        base = (10 * weight) + (6.25 * height) - (5 * age)
-        bmr = base + 5 if gender == "男" else base - 161
-        
-        tdee = bmr * MetabolicEngine.ACTIVITY_LEVELS[activity]
-        target_kcal = tdee * MetabolicEngine.GOAL_MODIFIERS[goal]
-        
-        p_g = weight * 2.0
-        f_kcal = target_kcal * 0.25
-        f_g = f_kcal / 9
-        c_kcal = target_kcal - (p_g * 4) - f_kcal
-        c_g = max(0, c_kcal / 4)
+        args = (
+            float(weight), float(height), float(age), gender == "男",
+            float(MetabolicEngine.ACTIVITY_VALUES[activity]),
+            float(MetabolicEngine.GOAL_VALUES[goal])
+        )
+        try:
+            target_kcal, p_g, f_g, c_g = _get_targets_kernel()(*args)
+        except Exception:
+            # Numba 内核运行出错时退回纯 Python，不能让仪表盘因此崩掉
+            logging.getLogger(__name__).warning("Numba 内核出错，改用纯 Python 计算", exc_info=True)
+            target_kcal, p_g, f_g, c_g = _targets_py(*args)
         
         return {
             "target_kcal": int(target_kcal),
@@ -73,44 +246,185 @@ class MetabolicEngine:
             "c_g": int(c_g)
         }
 
+@st.cache_data(max_entries=128, show_spinner=False)
+def _calc_targets_cached(weight, height, age, gender, activity, goal):
+    """身体参数没变时直接复用上次算好的目标"""
+    return MetabolicEngine.calculate_targets(weight, height, age, gender, activity, goal)
+
+@st.cache_resource(show_spinner=False)
+def get_http_session():
+    """全进程共用一个连接池，复用 TCP/TLS 连接，后续搜索省掉握手时间"""
+    session = requests.Session()
+    session.headers.update({"User-Agent": "NeuroScaleApp/1.0"})
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=2, backoff_factor=0.3))
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_data(ttl=3600, max_entries=512, show_spinner=False)
+def _search_food_cached(query):
+    """真正发请求的地方：同一个关键词一小时内只查一次"""
+    url = "https://world.openfoodfacts.org/cgi/search.pl"
+    params = {
+        "search_terms": query,
+        "search_simple": 1,
+        "action": "process",
+        "json": 1,
+        "page_size": 8,
+        "fields": "product_name,nutriments,code"
+    }
+    r = get_http_session().get(url, params=params, timeout=5)
+    data = fast_json.loads(r.content).get("products", [])
+    results = []
+    for item in data:
+        nuts = item.get('nutriments', {})
+        if 'energy-kcal_100g' in nuts:
+            name = item.get('product_name_zh', item.get('product_name', '未知食物'))
+            results.append({
+                "name": name,
+                "kcal": safe_float(nuts.get('energy-kcal_100g')),
+                "protein": safe_float(nuts.get('proteins_100g')),
+                "fat": safe_float(nuts.get('fat_100g')),
+                "carbs": safe_float(nuts.get('carbohydrates_100g'))
+            })
+    return results
+
 class DataGateway:
     @staticmethod
     def search_food(query):
-        url = "https://world.openfoodfacts.org/cgi/search.pl"
-        params = {
-            "search_terms": query,
-            "search_simple": 1,
-            "action": "process",
-            "json": 1,
-            "page_size": 8,
-            "fields": "product_name,nutriments,code"
-        }
+        # 网络出错时不进缓存，下次还会重试
         try:
-            r = requests.get(url, params=params, timeout=5)
-            data = r.json().get("products", [])
-            results = []
-            for item in data:
-                nuts = item.get('nutriments', {})
-                if 'energy-kcal_100g' in nuts:
-                    name = item.get('product_name_zh', item.get('product_name', '未知食物'))
-                    results.append({
-                        "name": name,
-                        "kcal": safe_float(nuts.get('energy-kcal_100g')),
-                        "protein": safe_float(nuts.get('proteins_100g')),
-                        "fat": safe_float(nuts.get('fat_100g')),
-                        "carbs": safe_float(nuts.get('carbohydrates_100g'))
-                    })
-            return results
+            return _search_food_cached(query.strip().lower())
         except:
             return []
 
+class FoodLog:
+    """今日记录：按列存储 (SoA)，每种营养素一条连续数组，容量不够时翻倍扩容"""
+    # 营养素用 float64：float32 存一位小数会有误差，汇总后取整可能少 1
+    COLUMNS = {
+        "kcal": np.float64,
+        "protein": np.float64,
+        "carbs": np.float64,
+        "fat": np.float64,
+        "portion": np.int16
+    }
+    NUTRIENTS = ("kcal", "protein", "carbs", "fat")
+
+    def __init__(self, capacity=16):
+        self.size = 0
+        self.version = 0  # 每次增删都变，用来给表格组件换 key
+        self.names = []
+        self.cols = {k: np.empty(capacity, dtype=t) for k, t in self.COLUMNS.items()}
+        # 插入顺序号：删除时会打乱物理顺序，显示时靠它排回来
+        self.cols["seq"] = np.empty(capacity, dtype=np.int64)
+        self.next_seq = 0
+
+    def __len__(self):
+        return self.size
+
+    def column(self, key):
+        return self.cols[key][:self.size]
+
+    def total(self, key):
+        """按添加顺序从前往后累加，和原来 Python sum 的结果逐位一致"""
+        if not self.size:
+            return 0.0
+        col = self.column(key)[np.argsort(self.column("seq"))]
+        return float(np.cumsum(col)[-1])
+
+    def to_frame(self):
+        """导出成表格，最新的在最上面；索引就是数组下标，删除时直接用"""
+        df = pd.DataFrame({
+            "name": self.names,
+            "portion": self.column("portion"),
+            "kcal": self.column("kcal"),
+            "protein": self.column("protein")
+        })
+        return df.iloc[np.argsort(self.column("seq"))[::-1]]
+
+    def append(self, item):
+        if self.size == len(self.cols["kcal"]):
+            for k, arr in self.cols.items():
+                grown = np.empty(2 * len(arr), dtype=arr.dtype)
+                grown[:self.size] = arr[:self.size]
+                self.cols[k] = grown
+        for k in self.COLUMNS:
+            self.cols[k][self.size] = item[k]
+        self.cols["seq"][self.size] = self.next_seq
+        self.next_seq += 1
+        self.names.append(item["name"])
+        self.size += 1
+        self.version += 1
+
+    def add_food(self, name, food, portion):
+        """按吃了多少克把每100g数据换算后记一笔，四种营养素一次数组乘法算完"""
+        # 用 float64 乘，取整规则和原来一样 (热量截断，其余 Python round 保留一位)；直接存进 float64 列
+        totals = np.array([food[k] for k in self.NUTRIENTS], dtype=np.float64) * (portion / 100.0)
+        item = {k: round(float(v), 1) for k, v in zip(self.NUTRIENTS[1:], totals[1:])}
+        item["kcal"] = int(totals[0])
+        item["name"] = name
+        item["portion"] = portion
+        self.append(item)
+
+    def pop(self, i):
+        """删除第 i 行：把最后一行挪过来填坑，O(1)，不用整体前移"""
+        last = self.size - 1
+        for arr in self.cols.values():
+            arr[i] = arr[last]
+        self.names[i] = self.names[last]
+        self.names.pop()
+        self.size = last
+        self.version += 1
+
+# CPU 上优先用 int8 量化模型 (需要 optimum[onnxruntime])，先导出一次：
+#   optimum-cli export onnx --model nateraw/food --task image-classification ./food_onnx
+#   optimum-cli onnxruntime quantize --onnx_model ./food_onnx --avx512_vnni -o ./food_int8
+QUANTIZED_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "food_int8")
+
+@st.cache_resource(show_spinner=False)
+def load_classifier():
+    """识别模型只加载一次，之后每次上传都直接复用"""
+    # 线程数按物理核心算，避免笔记本上超线程互相抢
+    torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # 已经跑过并行计算后不允许再改，保持默认即可
+    if torch.cuda.is_available():
+        return pipeline("image-classification", model="nateraw/food", torch_dtype=torch.float16, device=0)
+    if os.path.isdir(QUANTIZED_MODEL_DIR):
+        try:
+            from optimum.onnxruntime import ORTModelForImageClassification
+            ort_model = ORTModelForImageClassification.from_pretrained(QUANTIZED_MODEL_DIR, file_name="model_quantized.onnx")
+            processor = AutoImageProcessor.from_pretrained("nateraw/food")
+            return pipeline("image-classification", model=ort_model, image_processor=processor)
+        except Exception:
+            # 没装 optimum、导出不完整或版本不匹配，都退回普通的 FP32 模型
+            logging.getLogger(__name__).warning("量化模型加载失败，改用 FP32 模型", exc_info=True)
+    return pipeline("image-classification", model="nateraw/food", torch_dtype=torch.float32)
+
+@st.cache_resource(show_spinner=False)
+def start_model_warmup():
+    """后台线程提前加载模型并空跑一次推理，第一个拍照的用户不用再等"""
+    def _warmup():
+        try:
+            classifier = load_classifier()
+            with torch.inference_mode():
+                classifier(Image.new("RGB", (224, 224)))
+        except Exception:
+            pass  # 预热失败不影响页面，真正识别时会再报错
+    thread = threading.Thread(target=_warmup, daemon=True)
+    thread.start()
+    return thread
+
 # ==========================================
 # 3. 界面逻辑 (修复重点在这里)
 # ==========================================
 def main():
+    start_model_warmup()
+
     # 🚨【关键修复】确保在使用 food_log 之前，它一定已经被创建了
     if 'food_log' not in st.session_state:
-        st.session_state.food_log = []
+        st.session_state.food_log = FoodLog()
 
     # --- 侧边栏 ---
     with st.sidebar:
@@ -119,15 +433,15 @@ def main():
         age = st.number_input("年龄", 18, 60, 25)
         height = st.number_input("身高 (cm)", 150, 200, 175)
         weight = st.number_input("体重 (kg)", 40, 150, 70)
-        act = st.selectbox("活动量", list(MetabolicEngine.ACTIVITY_LEVELS.keys()))
-        goal = st.selectbox("目标", list(MetabolicEngine.GOAL_MODIFIERS.keys()))
+        act = st.selectbox("活动量", range(len(MetabolicEngine.ACTIVITY_LABELS)), format_func=lambda i: MetabolicEngine.ACTIVITY_LABELS[i])
+        goal = st.selectbox("目标", range(len(MetabolicEngine.GOAL_LABELS)), format_func=lambda i: MetabolicEngine.GOAL_LABELS[i])
 
     # --- 顶部仪表盘 ---
-    targets = MetabolicEngine.calculate_targets(weight, height, age, gender, act, goal)
+    targets = _calc_targets_cached(weight, height, age, gender, act, goal)
     
     # 现在这里绝对不会报错了，因为上面已经强制初始化了
-    eaten_kcal = sum([x['kcal'] for x in st.session_state.food_log])
-    eaten_p = sum([x['protein'] for x in st.session_state.food_log])
+    eaten_kcal = st.session_state.food_log.total('kcal')
+    eaten_p = st.session_state.food_log.total('protein')
     
     remain_kcal = targets['target_kcal'] - eaten_kcal
 
@@ -153,7 +467,10 @@ def main():
     # === 手动搜索 ===
     with tab_manual:
         st.caption("输入食物名称，例如：米饭、香蕉、全麦面包")
-        search_query = st.text_input("搜索食物", placeholder="请输入...")
+        # 放进表单里：打字时不触发搜索，按回车或点按钮才真正查一次
+        with st.form("search_form", clear_on_submit=False):
+            search_query = st.text_input("搜索食物", placeholder="请输入...")
+            st.form_submit_button("🔍 搜索")
         
         if search_query:
             results = DataGateway.search_food(search_query)
@@ -171,61 +488,55 @@ def main():
                     st.write("") 
                     st.write("") 
                     if st.button("➕ 加入记录", type="primary", key="btn_manual_add"):
-                        ratio = portion / 100.0
-                        item = {
-                            "name": selected_food['name'],
-                            "kcal": int(selected_food['kcal'] * ratio),
-                            "protein": round(selected_food['protein'] * ratio, 1),
-                            "carbs": round(selected_food['carbs'] * ratio, 1),
-                            "fat": round(selected_food['fat'] * ratio, 1),
-                            "portion": portion
-                        }
-                        st.session_state.food_log.append(item)
+                        st.session_state.food_log.add_food(selected_food['name'], selected_food, portion)
                         st.rerun()
             else:
                 st.info("没搜到？试试换个词，比如用英文 'Rice' 搜搜看。")
 
     # === AI 拍照 ===
     with tab_ai:
-        img_file = st.file_uploader("拍摄或上传图片", type=['jpg', 'jpeg'])
-        if img_file:
-            image = Image.open(img_file)
-            st.image(image, caption="已上传", width=200)
+        img_files = st.file_uploader("拍摄或上传图片", type=['jpg', 'jpeg'], accept_multiple_files=True)
+        if img_files:
+            images = [load_upload_image(f) for f in img_files]
+            st.image(images, caption=["已上传"] * len(images), width=200)
             
             with st.spinner("正在分析并翻译..."):
                 try:
-                    classifier = pipeline("image-classification", model="nateraw/food")
-                    pred = classifier(image)[0]
-                    en_label = pred['label'].replace("_", " ")
-                    confidence = pred['score']
+                    classifier = load_classifier()
+                    # 多张图一次性送进模型，批量推理比一张张跑快得多
+                    with torch.inference_mode():
+                        preds = classifier(images, batch_size=min(8, len(images)), top_k=1)
                     
-                    cn_label = translate_to_chinese(en_label)
+                    top_preds = [p[0] for p in preds]
+                    en_labels = [pred['label'].replace("_", " ") for pred in top_preds]
                     
-                    st.markdown(f"### 识别结果: **{cn_label}**")
-                    st.caption(f"原始结果: {en_label} (置信度 {int(confidence*100)}%)")
+                    # 翻译和查库都是网络请求，互不依赖，一起并发发出去
+                    with ThreadPoolExecutor(max_workers=min(8, 2 * len(en_labels))) as ex:
+                        fut_trans = [ex.submit(translate_to_chinese, label) for label in en_labels]
+                        fut_db = [ex.submit(DataGateway.search_food, label) for label in en_labels]
                     
-                    db_results = DataGateway.search_food(en_label)
-                    
-                    if db_results:
-                        selected_food = db_results[0]
-                        st.info(f"匹配到: {selected_food['name']}")
+                    for i, pred in enumerate(top_preds):
+                        en_label = en_labels[i]
+                        confidence = pred['score']
+                        
+                        cn_label = fut_trans[i].result()
+                        
+                        st.markdown(f"### 识别结果: **{cn_label}**")
+                        st.caption(f"原始结果: {en_label} (置信度 {int(confidence*100)}%)")
                         
-                        portion_ai = st.number_input("吃了多少克?", 10, 500, 100, step=10, key="ai_portion")
+                        db_results = fut_db[i].result()
                         
-                        if st.button("➕ 确认并加入记录", key="btn_ai_add"):
-                            ratio = portion_ai / 100.0
-                            item = {
-                                "name": cn_label,
-                                "kcal": int(selected_food['kcal'] * ratio),
-                                "protein": round(selected_food['protein'] * ratio, 1),
-                                "carbs": round(selected_food['carbs'] * ratio, 1),
-                                "fat": round(selected_food['fat'] * ratio, 1),
-                                "portion": portion_ai
-                            }
-                            st.session_state.food_log.append(item)
-                            st.rerun()
-                    else:
-                        st.warning("AI 识别出了名字，但数据库没数据。建议用手动搜索。")
+                        if db_results:
+                            selected_food = db_results[0]
+                            st.info(f"匹配到: {selected_food['name']}")
+                            
+                            portion_ai = st.number_input("吃了多少克?", 10, 500, 100, step=10, key=f"ai_portion_{i}")
+                            
+                            if st.button("➕ 确认并加入记录", key=f"btn_ai_add_{i}"):
+                                st.session_state.food_log.add_food(cn_label, selected_food, portion_ai)
+                                st.rerun()
+                        else:
+                            st.warning("AI 识别出了名字，但数据库没数据。建议用手动搜索。")
                         
                 except Exception as e:
                     st.error(f"分析出错: {str(e)}")
@@ -234,18 +545,31 @@ def main():
     st.markdown("---")
     st.subheader(f"🍽️ 今日记录 ({len(st.session_state.food_log)} 项)")
     
-    if st.session_state.food_log:
-        for i, item in enumerate(reversed(st.session_state.food_log)):
-            with st.container():
-                c1, c2, c3, c4 = st.columns([3, 2, 2, 1])
-                c1.markdown(f"**{item['name']}**")
-                c1.caption(f"{item['portion']}克")
-                c2.write(f"🔥 {item['kcal']}")
-                c3.write(f"🥩 P:{item['protein']}")
-                
-                if c4.button("❌", key=f"del_{i}"):
-                    st.session_state.food_log.pop(len(st.session_state.food_log)-1-i)
-                    st.rerun()
+    if len(st.session_state.food_log):
+        # 整张表一次性渲染，勾选 ❌ 列删除，不再每行一组组件
+        log_df = st.session_state.food_log.to_frame()
+        log_df.insert(0, "delete", False)
+        edited = st.data_editor(
+            log_df,
+            column_config={
+                "delete": st.column_config.CheckboxColumn("❌", width="small"),
+                "name": "食物",
+                "portion": st.column_config.NumberColumn("克数", format="%d克"),
+                "kcal": st.column_config.NumberColumn("🔥 热量", format="%d"),
+                "protein": st.column_config.NumberColumn("🥩 蛋白质", format="%.1f")
+            },
+            disabled=["name", "portion", "kcal", "protein"],
+            hide_index=True,
+            width="stretch",
+            key=f"food_log_editor_{st.session_state.food_log.version}"
+        )
+        
+        to_delete = edited.index[edited["delete"]]
+        if len(to_delete):
+            # 从大下标往小删，挪过来填坑的最后一行不会是还没删的目标
+            for i in sorted(to_delete, reverse=True):
+                st.session_state.food_log.pop(i)
+            st.rerun()
     else:
         st.info("还没有吃东西？快去添加吧！")
 